@@ -8,57 +8,24 @@
 # Copyright (c) 2024 Aryan
 # SPDX-License-Identifier: BSD-3-Clause
 
-# Version: 3.0.2
+# Version: 3.1.2
 
 # Import modules to interface with the system.
 import argparse
-import colorama
+import concurrent.futures
+import heapq
 import os
 import pathlib
-import shutil
 import socket
+import subprocess
 import sys
 import typing
 
-
-def check_if_superuser() -> None:
-    """
-    Check if the user is root. If the user isn't root then it exits the script
-    with a failure.
-
-    Returns:
-        None: This function does not return a value.
-    """
-
-    # Check if uid = 0 (root) to continue.
-    if os.getuid() != 0:
-        program_name = pathlib.Path(sys.argv[0]).name
-        print(colorize(f"{program_name}: must be superuser.", colorama.Fore.RED))
-        sys.exit(1) # Exit with error code 1
-
-    return None
-
-
-def colorize(text: str, color:str) -> str:
-    """
-    Color text based on user defined choice.
-
-    Args:
-        text  (str): Text that is about to be printed.
-        color (str): Foreground color that the text should be printed in.
-
-    Returns:
-        text (str): Text that has been colored or not depending on environment variable.
-    """
-
-    # Global variables
-    global no_color
-
-    # Color the text if no_color is not set.
-    if not no_color:
-        text = color + text
-
-    return text
+# Import helpers shared with the other clean up scripts.
+import kernel_cleanup_common
+from kernel_cleanup_common import (GREEN, RED, RESET, check_if_superuser,
+                                   colorize, remove_tree)
+from kernel_version import kernel_version_key
 
 
 def create_prunable_list(src_dir: pathlib.PosixPath) -> typing.Optional[list]:
@@ -71,81 +38,94 @@ def create_prunable_list(src_dir: pathlib.PosixPath) -> typing.Optional[list]:
                                      directories.
 
     Returns:
-        available_dirs (Optional[list]): List of all the available files/directories that
-                                         can be pruned, otherwise returns None.
+        available_dirs (Optional[list]): List of (name, entries) tuples where
+                                         name is the prunable subdirectory
+                                         (i.e linux, uki, vmlinuz) and entries
+                                         are its files/directories as
+                                         os.DirEntry objects, otherwise returns
+                                         None.
     """
 
     # Define prunable directories.
     prunable_dirs = [ "linux", "uki", "vmlinuz" ]
     available_dirs = []
 
-    for sub_dir in src_dir.iterdir():
+    # Use os.scandir() so the directory entries carry their type information
+    # from the directory stream instead of needing extra stat() calls.
+    with os.scandir(src_dir) as it:
+        entries = list(it)
+
+    for entry in entries:
         temp_list = []
         
         # Check if any of the subdirectories match our prunable directories if
         # so add them to our list.
-        if sub_dir.name in prunable_dirs:
-            for sub_sub_dir in sub_dir.resolve().iterdir():
-                temp_list.append(sub_sub_dir)
+        if entry.name in prunable_dirs:
+            # src_dir is already absolute so only resolve the subdirectory if
+            # it's a symlink.
+            sub_dir = entry.path
+
+            if entry.is_symlink():
+                sub_dir = os.path.realpath(sub_dir)
 
-            # Sort the temp_list from newest to oldest version.
-            sorted_temp_list = sorted(temp_list, reverse=True)
+            with os.scandir(sub_dir) as sub_it:
+                for sub_entry in sub_it:
+                    temp_list.append(sub_entry)
 
-            # Append the sorted list to our list of lists.
-            available_dirs.append(sorted_temp_list)
+            # Append the list along with its subdirectory name to our list.
+            available_dirs.append((entry.name, temp_list))
     
-    # If our list of lists is empty return None
+    # If our list is empty return None
     if len(available_dirs) == 0:
         return None
     else:
         return available_dirs
 
 
-def removal_prompt(sub_list:list) -> typing.Optional[list]:
+def removal_prompt(path_name: str, sub_list:list) -> typing.Optional[list]:
     """
     Prompt the user if they want to remove deprecated files/directories.
 
     Args:
-        sub_list (list): A sorted list in descending order of the absolute paths
-                         to the target files/directories within a specific
-                         subdirectory (i.e linux, uki, vmlinuz).
+        path_name (str): The name of the subdirectory being pruned (i.e linux,
+                         uki, vmlinuz).
+        sub_list (list): A list of os.DirEntry objects for the target
+                         files/directories within a specific subdirectory (i.e
+                         linux, uki, vmlinuz).
 
     Returns:
-        paths_to_remove (Optional[list]): A list of absolute paths to the files/directories that
+        paths_to_remove (Optional[list]): A list of os.DirEntry objects for the files/directories that
                                           are planned to be removed, otherwise
                                           returns None.
     """
 
-    path_name = pathlib.Path(sub_list[0]).parts[5]
-
     # If there are only 2 or less files/directories in the parent directory it has
     # already been pruned.
     if len(sub_list) <= 2:
-        print(colorize(f"The {path_name} directory has already been pruned.", colorama.Fore.GREEN))
+        print(colorize(f"The {path_name} directory has already been pruned.", GREEN))
         return None
 
     # Inform the user that all the files/directories apart from the latest two are to be removed.
     print(colorize(f"We will keep the latest two {path_name} files/directories:\n",
-                   colorama.Style.RESET_ALL))
-    saved_paths = sub_list[:2]
+                   RESET))
+    # Only the newest two files/directories need to be ordered, so pick them
+    # out with a heap instead of sorting the whole list. They are compared by
+    # version number so 6.10 is newer than 6.9.
+    saved_paths = heapq.nlargest(2, sub_list,
+                                 key=lambda e: kernel_version_key(e.name))
 
-    for item in saved_paths:
-        print(item)
+    sys.stdout.write("\n".join(entry.path for entry in saved_paths) + "\n\n")
 
-    print("")
     print(colorize(f"We will remove the following {path_name} files/directories:\n",
-                   colorama.Style.RESET_ALL))
-    paths_to_remove = sub_list[2:]
-
-    for item in paths_to_remove:
-        print(item)
+                   RESET))
+    paths_to_remove = [entry for entry in sub_list if entry not in saved_paths]
 
-    print("")
+    sys.stdout.write("\n".join(entry.path for entry in paths_to_remove) + "\n\n")
 
     # Ask the user if they want to continue with the removal process.
     while True:
         user_input = input(colorize("Would you like to remove these paths? (Y/n) ",
-                                    colorama.Style.RESET_ALL)).strip().lower()
+                                    RESET)).strip().lower()
         print("")
 
         if user_input == "" or user_input == "y" or user_input == "yes":
@@ -153,9 +133,28 @@ def removal_prompt(sub_list:list) -> typing.Optional[list]:
         elif user_input == "n" or user_input == "no":
             return None
         else:
-            print(colorize(f"\nInvalid input: \"{user_input}\"",
-                           colorama.Fore.RED))
-            print(colorize(f"Please try again.", colorama.Fore.RED))
+            print(colorize(f"\nInvalid input: \"{user_input}\"", RED))
+            print(colorize(f"Please try again.", RED))
+
+
+def remove_entry(entry: os.DirEntry) -> None:
+    """
+    Remove a single file/directory. The entry type is cached from the directory
+    listing so this doesn't need any extra stat() calls.
+
+    Args:
+        entry (os.DirEntry): The file/directory that should be removed.
+
+    Returns:
+        None: This function does not return a value.
+    """
+
+    if entry.is_dir(follow_symlinks=False):
+        remove_tree(entry.path)
+    else:
+        os.unlink(entry.path)
+
+    return None
 
 
 def prune_list(removal_list:list) -> None:
@@ -163,8 +162,8 @@ def prune_list(removal_list:list) -> None:
     Remove all directories in the removal_list list.
 
     Args:
-        removal_list (list): A list of lists of absolute paths to the files/directories that
-                             are planned to be removed.
+        removal_list (list): A list of lists of os.DirEntry objects for the
+                             files/directories that are planned to be removed.
 
     Returns:
         None: This function does not return a value.
@@ -173,20 +172,40 @@ def prune_list(removal_list:list) -> None:
         Exception: If there was an issue with removing a file/directory.
     """
 
-    # Remove each element in the list of lists.
-    for sub_list in removal_list:
-        for path in sub_list:
+    # Flatten the list of lists so everything can be removed in one go.
+    all_entries = [entry for sub_list in removal_list for entry in sub_list]
+
+    # Remove everything with a single rm process since it walks the trees in C
+    # and is much faster than shutil.rmtree on large kernel source trees. If rm
+    # isn't available fall back to removing each file/directory in Python.
+    try:
+        subprocess.run(["rm", "-rf", "--", *all_entries], check=True)
+    except FileNotFoundError:
+        # The files/directories don't share any inodes so remove them in
+        # parallel. The GIL is released during the unlink/rmdir syscalls so
+        # threads are enough to overlap the I/O.
+        max_workers = min(8, len(all_entries))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(remove_entry, entry): entry
+                       for entry in all_entries}
+
             # Try removing each file/directory and if it doesn't work throw an error.
-            try:
-                if path.is_dir():
-                    shutil.rmtree(path)
-                    print(colorize(f"Removed {path}.", colorama.Fore.GREEN))
-                elif path.is_file():
-                    path.unlink()
-                    print(colorize(f"Removed {path}.", colorama.Fore.GREEN))
-            except Exception as e:
-                print(colorize(f"Error removing {path}: {e}", colorama.Fore.RED))
-                sys.exit(1)
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(colorize(f"Error removing {futures[future].path}: {e}", RED))
+                    sys.exit(1)
+    except Exception as e:
+        print(colorize(f"Error removing files/directories: {e}", RED))
+        sys.exit(1)
+
+    # Work out the color prefix once rather than calling colorize per entry.
+    prefix = colorize("", GREEN)
+
+    for entry in all_entries:
+        sys.stdout.write(prefix + "Removed " + entry.path + ".\n")
 
     return None
 
@@ -218,39 +237,33 @@ def main():
     prompt user for removal. If permission is granted remove them.
     """
 
-    # Global variables
-    global no_color
-
     # Check if script is run as root.
     check_if_superuser()
 
     # Parse our command-line arguments.
     args = parse_arguments()
-    no_color = args.nocolor
     system_name = args.hostname
 
-    # Obtain environmental variables.
-    if os.getenv("NO_COLOR") == "1":
-        no_color = True
+    if args.nocolor:
+        kernel_cleanup_common.no_color = True
 
     # Check if the specified system's root kernel source directory exists.
     local_src_dir = pathlib.Path("/usr/local/src/")
     system_src_dir = local_src_dir / f"{system_name}"
     
     if not system_src_dir.is_dir():
-        print(colorize(f"{system_src_dir} does not exist.",
-                       colorama.Fore.RED))
+        print(colorize(f"{system_src_dir} does not exist.", RED))
         sys.exit(1)
 
-    # Obtain a sorted list of lists of all prunable files/directories.
-    sorted_contents = create_prunable_list(system_src_dir)
+    # Obtain a list of all prunable files/directories grouped by subdirectory.
+    prunable_contents = create_prunable_list(system_src_dir)
 
     # If no directories are found for pruning then user does not have their
     # kernel source directories in the right format.
-    if sorted_contents is None:
+    if prunable_contents is None:
         print(colorize(f"No available directories have been found that can be" \
                 " pruned. Please make sure you have your directories in the" \
-                "correct format.", colorama.Fore.RED))
+                "correct format.", RED))
         sys.exit(1)
 
     # Ask if the user wants to remove deprecated files/directories and add them to a
@@ -259,8 +272,8 @@ def main():
 
     ## If the user has chosen not to remove certain files/directories don't add
     ## them to the removal list.
-    for sub_list in sorted_contents:
-        temp_removal_list = removal_prompt(sub_list)
+    for path_name, sub_list in prunable_contents:
+        temp_removal_list = removal_prompt(path_name, sub_list)
 
         if temp_removal_list is not None:
             removal_list.append(temp_removal_list)
@@ -274,7 +287,7 @@ def main():
     prune_list(removal_list)
 
     # Success!
-    print(colorize(f"Pruned all chosen kernel source directories.", colorama.Fore.GREEN))
+    print(colorize(f"Pruned all chosen kernel source directories.", GREEN))
 
 
 if __name__ == "__main__":
@@ -7,98 +7,59 @@
 # Copyright (c) 2024 Aryan
 # SPDX-License-Identifier: BSD-3-Clause
 
-# Version: 3.0.0
+# Version: 3.1.2
 
 # Import standard libraries.
 import argparse
-import colorama
+import heapq
 import os
 import pathlib
-import shutil
+import subprocess
 import sys
 
-def check_if_superuser() -> None:
-    """
-    Check if the user is root. If the user isn't root then it exits the script
-    with a failure.
-
-    Returns:
-        None: This function does not return a value.
-    """
-
-    # Check if uid = 0 (root) to continue.
-    if os.getuid() != 0:
-        program_name = pathlib.Path(sys.argv[0]).name
-        print(colorize(f"{program_name}: must be superuser.", colorama.Fore.RED))
-        sys.exit(1) # Exit with error code 1
-
-    return None
-
-
-def colorize(text: str, color:str) -> str:
-    """
-    Color text based on user defined choice.
-
-    Args:
-        text  (str): Text that is about to be printed.
-        color (str): Foreground color that the text should be printed in.
-
-    Returns:
-        text (str): Text that has been colored or not depending on environment variable.
-    """
-
-    # Global variables
-    global no_color
-
-    # Color the text if no_color is not set.
-    if not no_color:
-        text = color + text
-
-    return text
+# Import helpers shared with the other clean up scripts.
+import kernel_cleanup_common
+from kernel_cleanup_common import (GREEN, RED, check_if_superuser,
+                                   colorize, remove_tree)
+from kernel_version import kernel_version_key
 
 
 def list_contents(parent_dir: pathlib.PosixPath) -> list:
     """
     List out the contents of parent_dir and store their absolute paths in a
-    list called contents. Then return that list sorted in descending order.
+    list called contents. Then return that list.
 
     Args:
         parent_dir (pathlib.PosixPath): The absolute path to where the parent directory is.
 
     Returns:
-        sorted_contents (list): A sorted list of all the absolute paths of
-                                parent_dir's contents in descending order.
+        contents (list): A list of all the absolute paths of parent_dir's
+                         contents.
     """
 
-    contents = []
-
-    # Append the absolute paths for every sub directory in the parent
-    # directory to the contents list.
-    for sub_dir in parent_dir.iterdir():
-        sub_dir_absolute_path = sub_dir.resolve()
-        contents.append(sub_dir_absolute_path)
+    # Collect the absolute paths for every sub directory in the parent
+    # directory. The entries are kept as plain strings since they are only
+    # compared and printed.
+    with os.scandir(parent_dir) as it:
+        contents = [entry.path for entry in it]
 
     # If there are only 2 or less directories in the parent directory it has
     # already been pruned so we can exit successfully.
     if len(contents) <= 2:
-        print(colorize(f"/lib/modules has already been pruned.",
-              colorama.Fore.GREEN))
+        print(colorize(f"/lib/modules has already been pruned.", GREEN))
         sys.exit(0) # Exit successfully
 
-    # Sort the list from highest to lowest to get the newest directories at the
-    # start.
-    sorted_contents = sorted(contents, reverse=True)
-    return sorted_contents
+    return contents
 
 
-def removal_prompt(sorted_contents:list) -> list:
+def removal_prompt(contents:list) -> list:
     """
     Prompt the user if they want to remove the older directories; otherwise,
     exit.
 
     Args:
-        sorted_contents (list): A sorted list in descending order of the absolute paths
-                         to the target directories.
+        contents (list): A list of the absolute paths to the target
+                         directories.
 
     Returns:
         paths_to_remove (list): A list of absolute paths to the directories that
@@ -108,16 +69,18 @@ def removal_prompt(sorted_contents:list) -> list:
     # Inform the user that all the directories apart from the latest two are to be removed.
 
     print("\nWe will keep the latest two module paths:\n")
-    saved_paths = sorted_contents[:2]
+    # Only the newest two directories need to be ordered, so pick them out
+    # with a heap instead of sorting the whole list. They are compared by
+    # version number so 6.10 is newer than 6.9.
+    saved_paths = heapq.nlargest(
+        2, contents, key=lambda path: kernel_version_key(os.path.basename(path)))
 
-    for item in saved_paths:
-        print(item)
+    sys.stdout.write("\n".join(saved_paths) + "\n")
 
     print("\nWe will remove the following module paths:\n")
-    paths_to_remove = sorted_contents[2:]
+    paths_to_remove = [path for path in contents if path not in saved_paths]
 
-    for item in paths_to_remove:
-        print(item)
+    sys.stdout.write("\n".join(paths_to_remove) + "\n")
 
     # Ask the user if they want to continue with the removal process.
     while True:
@@ -126,12 +89,11 @@ def removal_prompt(sorted_contents:list) -> list:
         if user_input == "" or user_input == "y" or user_input == "yes":
             break
         elif user_input == "n" or user_input == "no":
-            print(colorize(f"\nExiting...", colorama.Fore.GREEN))
+            print(colorize(f"\nExiting...", GREEN))
             sys.exit(0) # Exit successfully
         else:
-            print(colorize(f"\nInvalid input: \"{user_input}\".",
-                           colorama.Fore.RED))
-            print(colorize(f"Please try again.", colorama.Fore.RED))
+            print(colorize(f"\nInvalid input: \"{user_input}\".", RED))
+            print(colorize(f"Please try again.", RED))
 
     return paths_to_remove
 
@@ -153,14 +115,27 @@ def remove_modules(paths_to_remove:list) -> None:
 
     print("")
 
-    # Try removing each directory and if it doesn't work throw an error.
-    for path in paths_to_remove:
-        try:
-            if path.is_dir():
-                shutil.rmtree(path)
-                print(colorize(f"Removed {path}.", colorama.Fore.GREEN))
-        except Exception as e:
-            print(colorize(f"Error removing {path}: {e}", colorama.Fore.RED))
+    # Remove all the directories with a single rm process since it walks the
+    # trees in C and is much faster than shutil.rmtree. If rm isn't available
+    # fall back to removing each directory in Python.
+    try:
+        subprocess.run(["rm", "-rf", "--", *paths_to_remove], check=True)
+    except FileNotFoundError:
+        # Try removing each directory and if it doesn't work throw an error.
+        for path in paths_to_remove:
+            path = pathlib.Path(path)
+
+            try:
+                if path.is_dir():
+                    remove_tree(path)
+                    print(colorize(f"Removed {path}.", GREEN))
+            except Exception as e:
+                print(colorize(f"Error removing {path}: {e}", RED))
+    except Exception as e:
+        print(colorize(f"Error removing module paths: {e}", RED))
+    else:
+        for path in paths_to_remove:
+            print(colorize(f"Removed {path}.", GREEN))
 
     return None
 
@@ -188,34 +163,28 @@ def main():
     Clean up module directories in /lib/modules/.
     """
 
-    # Global variables
-    global no_color
-
     # Check if script is run as root.
     check_if_superuser()
 
     # Parse our command-line arguments.
     args = parse_arguments()
-    no_color = args.nocolor
 
-    # Obtain environmental variables.
-    if os.getenv("NO_COLOR") == "1":
-        no_color = True
+    if args.nocolor:
+        kernel_cleanup_common.no_color = True
 
-    # Sort module directories based on version in descending order.
+    # List the module directories.
     parent_dir = "/lib/modules/"
     parent_dir = pathlib.Path(parent_dir)
-    sorted_contents = list_contents(parent_dir)
+    contents = list_contents(parent_dir)
 
     # Ask if the user wants to remove deprecated directories.
-    paths_to_remove = removal_prompt(sorted_contents)
+    paths_to_remove = removal_prompt(contents)
 
     # Remove the deprecated directories.
     remove_modules(paths_to_remove)
 
     # Success!
-    print(colorize(f"\nSuccessfully pruned /lib/modules. Exiting...",
-                   colorama.Fore.GREEN))
+    print(colorize(f"\nSuccessfully pruned /lib/modules. Exiting...", GREEN))
 
 
 if __name__ == "__main__":
@@ -7,17 +7,21 @@
 # Copyright (c) 2024 Aryan
 # SPDX-License-Identifier: BSD-3-Clause
 
-# Version: 1.0.5
+# Version: 1.3.4
 
 # Import modules to interface with the system.
 import argparse
-import colorama
+import concurrent.futures
+import contextlib
+import functools
 import os
 import pathlib
 import shutil
 import socket
 import subprocess
 import sys
+import types
+import typing
 
 
 def check_if_superuser() -> None:
@@ -32,37 +36,42 @@ def check_if_superuser() -> None:
     # Check if uid = 0 (root) to continue.
     if os.getuid() != 0:
         program_name = pathlib.Path(sys.argv[0]).name
-        print(colorize(f"{program_name}: must be superuser.", colorama.Fore.RED))
+        print(f"{C.red}{program_name}: must be superuser.{C.reset}")
         sys.exit(1) # Exit with error code 1
 
     return None
 
 
-def colorize(text: str, color:str) -> str:
+def ansi_colors(no_color: bool) -> types.SimpleNamespace:
     """
-    Color text based on user defined choice.
+    Build the ANSI escape sequences that are used to color the output.
 
     Args:
-        text  (str): Text that is about to be printed.
-        color (str): Foreground color that the text should be printed in.
+        no_color (bool): If True then every sequence is an empty string.
 
     Returns:
-        text (str): Text that has been colored or not depending on environment variable.
+        colors (types.SimpleNamespace): The red, green and reset sequences.
     """
 
-    # Global variables
-    global no_color
+    if no_color:
+        colors = types.SimpleNamespace(red="", green="", reset="")
+    else:
+        colors = types.SimpleNamespace(red="\x1b[31m", green="\x1b[32m",
+                                       reset="\x1b[0m")
 
-    # Color the text if no_color is not set.
-    if not no_color:
-        text = color + text
+    return colors
 
-    return text
 
+# Color sequences used by print(). NO_COLOR is honored straight away and main()
+# rebuilds them once --nocolor has been parsed.
+C = ansi_colors(os.getenv("NO_COLOR") == "1")
 
+
+@functools.lru_cache(maxsize=None)
 def check_for_executable(ex_name: str) -> bool:
     """
-    Checks if executable is installed in the user's PATH.
+    Checks if executable is installed in the user's PATH. The result is cached
+    so repeated checks for the same executable don't search the PATH again.
 
     Args:
         ex_name (str): The name of the executable.
@@ -72,29 +81,64 @@ def check_for_executable(ex_name: str) -> bool:
         
     """
 
-    path_dirs = os.environ.get("PATH").split(os.pathsep)
-    found = False
+    found = shutil.which(ex_name) is not None
 
-    for directory in path_dirs:
-        ex_path = pathlib.Path(directory) / f"{ex_name}"
+    return found
 
-        if ex_path.exists():
-            found = True
-            break
 
-    return found
+def count_distcc_slots(distcc_hosts: str) -> int:
+    """
+    Count the number of parallel jobs that the distcc hosts can take. Each host
+    takes the number after its slash, otherwise distcc's default of 4 jobs (2
+    for localhost).
+
+    Args:
+        distcc_hosts (str): The host list in the DISTCC_HOSTS format.
+
+    Returns:
+        slots (int): The total number of jobs across every host.
+    """
+
+    slots = 0
+
+    for host in distcc_hosts.split():
+        # Skip options such as --randomize and +zeroconf.
+        if host.startswith(("-", "+")):
+            continue
+
+        # Drop the ",cpp,lzo" style options after the host specification.
+        host_spec = host.split(",", 1)[0]
+
+        if "/" in host_spec:
+            host_slots = host_spec.rsplit("/", 1)[1]
+
+            # Exit if the number of jobs after the slash isn't a number.
+            if not host_slots.isdigit():
+                print(f"{C.red}Error: {host} in --distcc doesn't have a valid " \
+                        f"number of jobs after the slash.{C.reset}")
+                sys.exit(1)
+
+            slots += int(host_slots)
+        elif host_spec == "localhost":
+            slots += 2
+        else:
+            slots += 4
+
+    return slots
 
 
-def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
-                   kver: str, local_src_dir: pathlib.PosixPath,
+def compile_kernel(compile_nvidia: bool, distcc_hosts: typing.Optional[str],
+                   is_uki: bool, jobs: int, kver: str,
+                   local_src_dir: pathlib.PosixPath,
                    work_dir: pathlib.PosixPath, sign_kernel: bool,
-                   system_name: str) -> None:
+                   system_name: str, use_ccache: bool) -> None:
     """
     Compiles the kernel and any components based on user choice and copies over
     the compiled efi executable to user's local source directory.
 
     Args:
         compile_nvidia (bool): If True compiles nvidia drivers using portage against the new kernel.
+        distcc_hosts (Optional[str]): If set the compilation is distributed to these distcc hosts.
         is_uki (bool): If True then signs the unified kernel image.
         kver (str): The name of the kernel version that is being compiled.
         local_src_dir (pathlib.PosixPath): The systems local source directory.
@@ -102,6 +146,7 @@ def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
         work_dir (pathlib.PosixPath): The directory where the compilation is taking place.
         sign_kernel (bool): If True calls the sign_efi function to sign the kernel.
         system_name (str): The name of the system that the kernel is compiled for.
+        use_ccache (bool): If True compiles the kernel through ccache when it is installed.
 
     Returns:
         output_file_path (pathlib.PosixPath): File path for the signed efi executable.
@@ -110,20 +155,49 @@ def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
     # Go into the work_dir.
     os.chdir(work_dir)
 
+    # Specify the environment used for compiling.
+    make_env = os.environ.copy()
+
+    # Hand the compilation off to the distcc hosts if they have been specified
+    # and run enough jobs to keep every one of them busy.
+    if distcc_hosts:
+        if not check_for_executable("distcc"):
+            print(f"{C.red}\nError: distcc was not found in your PATH. This is" \
+                    f"needed to distribute the compilation.{C.reset}")
+            sys.exit(1)
+
+        jobs = max(jobs, count_distcc_slots(distcc_hosts))
+        make_env["DISTCC_HOSTS"] = distcc_hosts
+
+    # Specify the make command used for compiling.
+    make_cmd = ["make", f"-j{jobs}"]
+
+    # Use ccache if it's available so recompiles of the same sources (e.g. the
+    # second pass for a UKI) are served from the cache.
+    if use_ccache and check_for_executable("ccache"):
+        make_cmd += ["CC=ccache gcc", "HOSTCC=ccache gcc"]
+        make_env["CCACHE_BASEDIR"] = str(work_dir)
+
+        # Let ccache send its cache misses to distcc.
+        if distcc_hosts:
+            make_env["CCACHE_PREFIX"] = "distcc"
+    elif distcc_hosts:
+        make_cmd.append("CC=distcc gcc")
+
     # Compile kernel
     try:
-        print(colorize(f"Compiling kernel {kver}...\n", colorama.Style.RESET_ALL))
-        result = subprocess.run(["make", f"-j{jobs}"], check=True)
+        print(f"Compiling kernel {kver}...\n")
+        result = subprocess.run(make_cmd, env=make_env, check=True)
     except Exception as e:
-        print(colorize(f"\nError compiling kernel {kver}: {e}", colorama.Fore.RED))
+        print(f"{C.red}\nError compiling kernel {kver}: {e}{C.reset}")
         sys.exit(1)
 
     # Install kernel modules to /lib/modules/.
     try:
-        print(colorize(f"\nInstalling kernel modules for {kver}...\n", colorama.Style.RESET_ALL))
+        print(f"\nInstalling kernel modules for {kver}...\n")
         result = subprocess.run(["make", "modules_install"], check=True)
     except Exception as e:
-        print(colorize(f"\nError installing kernel modules for {kver}: {e}", colorama.Fore.RED))
+        print(f"{C.red}\nError installing kernel modules for {kver}: {e}{C.reset}")
         sys.exit(1)
 
     # Specify vmlinuz output directory.
@@ -132,8 +206,8 @@ def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
     if is_uki:
         # Check if dracut is available.
         if not check_for_executable("dracut"):
-            print(colorize("\nError: dracut was not found in your PATH. This is" \
-                    "needed to generate an initramfs.", colorama.Fore.RED))
+            print(f"{C.red}\nError: dracut was not found in your PATH. This is" \
+                    f"needed to generate an initramfs.{C.reset}")
             sys.exit(1)
 
         # Set output path for initramfs cpio image.
@@ -141,18 +215,18 @@ def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
 
         # Build initramfs
         try:
-            print(colorize(f"\nBuilding initramfs for {kver}...\n", colorama.Style.RESET_ALL))
+            print(f"\nBuilding initramfs for {kver}...\n")
             result = subprocess.run(["dracut", "-f", f"--kver={kver}", initramfs_path], check=True)
         except Exception as e:
-            print(colorize(f"\nError building initramfs for {kver}: {e}", colorama.Fore.RED))
+            print(f"{C.red}\nError building initramfs for {kver}: {e}{C.reset}")
             sys.exit(1)
 
         # Compile kernel with newly built initramfs cpio image.
         try:
-            print(colorize(f"\nCompiling kernel {kver} with the newly built initramfs...\n", colorama.Style.RESET_ALL))
-            result = subprocess.run(["make", f"-j{jobs}"], check=True)
+            print(f"\nCompiling kernel {kver} with the newly built initramfs...\n")
+            result = subprocess.run(make_cmd, env=make_env, check=True)
         except Exception as e:
-            print(colorize(f"\nError compiling kernel {kver}: {e}", colorama.Fore.RED))
+            print(f"{C.red}\nError compiling kernel {kver}: {e}{C.reset}")
             sys.exit(1)
 
         # Specify uki output directory.
@@ -164,34 +238,81 @@ def compile_kernel(compile_nvidia: bool, is_uki: bool, jobs: int,
     # Specify the path to the bzImage.
     bzimage_path = work_dir / "arch" / "x86" / "boot" / "bzImage"
 
+    # Signing/copying the efi executable and compiling the nvidia drivers
+    # don't depend on each other so run them at the same time.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(output_efi, bzimage_path, is_uki, kver,
+                                   output_file_path, sign_kernel, work_dir)]
+
+        if compile_nvidia:
+            futures.append(executor.submit(compile_nvidia_drivers, kver))
+
+        # Wait for both steps and re-raise a failure (the steps exit with
+        # sys.exit on error). A failed signing still waits for emerge to
+        # finish since a running thread can't be stopped.
+        for future in futures:
+            future.result()
+
+    return output_file_path
+
+
+def output_efi(bzimage_path: pathlib.PosixPath, is_uki: bool, kver: str,
+               output_file_path: pathlib.PosixPath, sign_kernel: bool,
+               work_dir: pathlib.PosixPath) -> None:
+    """
+    Signs the compiled bzImage to output_file_path if the user has specified it,
+    otherwise copies it there.
+
+    Args:
+        bzimage_path (pathlib.PosixPath): File path for the bzImage in the work directory.
+        is_uki (bool): If True then signs the unified kernel image.
+        kver (str): The name of the kernel version that is being compiled.
+        output_file_path (pathlib.PosixPath): File path for the efi executable.
+        sign_kernel (bool): If True calls the sign_efi function to sign the kernel.
+        work_dir (pathlib.PosixPath): The directory where the compilation is taking place.
+
+    Returns:
+        None: This function does not return a value.
+    """
+
     # Sign the kernel if user has specified it.
     if sign_kernel:
         sign_efi(bzimage_path, is_uki, kver, output_file_path, work_dir)
     else:
         try:
             shutil.copyfile(bzimage_path, output_file_path)
-            print(colorize(f"Copied vmlinuz-{kver}.efi to local source directory.",
-                           colorama.Fore.GREEN))
+            print(f"{C.green}Copied vmlinuz-{kver}.efi to local source directory.{C.reset}")
         except Exception as e:
-            print(colorize(f"Unknown error when copying vmlinuz-{kver}.efi to local \
-                           source directory: {e}", colorama.Fore.RED))
+            print(f"{C.red}Unknown error when copying vmlinuz-{kver}.efi to local \
+                           source directory: {e}{C.reset}")
             sys.exit(1)
 
-    # Compile nvidia drivers against new compiled linux version.
-    if compile_nvidia:
-        # Specify default options for emerge to override whats in make.conf.
-        env = os.environ.copy() # Dictionary of all current env variables.
-        env["EMERGE_DEFAULT_OPTS"] = "--verbose" # Appends this environment variable to current env.
+    return None
 
-        try:
-            print(colorize(f"\nCompiling nvidia drivers for {kver}...\n", colorama.Style.RESET_ALL))
-            result = subprocess.run(["emerge", "x11-drivers/nvidia-drivers"],
-                                    env=env, check=True)
-        except Exception as e:
-            print(colorize(f"\nError compiling nvidia drivers for {kver}: {e}", colorama.Fore.RED))
-            sys.exit(1)
 
-    return output_file_path
+def compile_nvidia_drivers(kver: str) -> None:
+    """
+    Compiles the nvidia drivers using portage against the new kernel.
+
+    Args:
+        kver (str): The name of the kernel version that is being compiled.
+
+    Returns:
+        None: This function does not return a value.
+    """
+
+    # Specify default options for emerge to override whats in make.conf.
+    emerge_env = {**os.environ, "EMERGE_DEFAULT_OPTS": "--verbose"}
+
+    try:
+        print(f"\nCompiling nvidia drivers for {kver}...\n")
+        result = subprocess.run(["emerge", "x11-drivers/nvidia-drivers"],
+                                env=emerge_env, check=True)
+    except Exception as e:
+        print(f"{C.red}\nError compiling nvidia drivers for {kver}: {e}{C.reset}")
+        sys.exit(1)
+
+    return None
 
 
 def sign_efi(bzimage_path: pathlib.PosixPath,
@@ -214,9 +335,8 @@ def sign_efi(bzimage_path: pathlib.PosixPath,
 
     # Check if sbsign is available.
     if not check_for_executable("sbsign"):
-        print(colorize("\nError: sbsign was not found in your PATH. This is" \
-                "needed to sign the efi executable to be used with secure boot.",
-                       colorama.Fore.RED))
+        print(f"{C.red}\nError: sbsign was not found in your PATH. This is" \
+                f"needed to sign the efi executable to be used with secure boot.{C.reset}")
         sys.exit(1)
 
     # Specify signature and certificate file paths.
@@ -225,17 +345,15 @@ def sign_efi(bzimage_path: pathlib.PosixPath,
     db_crt_path = key_dir / "db.crt"
 
     # Check if db.key and db.crt exist.
-    if not db_key_path.is_file():
-        print(colorize(f"\nError: Can't find db.key, which is needed for" \
-                "signing the kernel.", colorama.Fore.RED))
-        print(colorize("It should be located in /etc/keys/efikeys/db.key.",
-                       colorama.Fore.RED))
+    if not os.path.isfile(db_key_path):
+        print(f"{C.red}\nError: Can't find db.key, which is needed for" \
+                f"signing the kernel.{C.reset}")
+        print(f"{C.red}It should be located in /etc/keys/efikeys/db.key.{C.reset}")
         sys.exit(1)
-    elif not db_crt_path.is_file():
-        print(colorize(f"\nError: Can't find db.crt, which is needed for signing the \
-                       kernel.", colorama.Fore.RED))
-        print(colorize("It should be located in /etc/keys/efikeys/db.crt.",
-                       colorama.Fore.RED))
+    elif not os.path.isfile(db_crt_path):
+        print(f"{C.red}\nError: Can't find db.crt, which is needed for signing the \
+                       kernel.{C.reset}")
+        print(f"{C.red}It should be located in /etc/keys/efikeys/db.crt.{C.reset}")
         sys.exit(1)
 
     # Sign the efi executable using sbsign.
@@ -245,15 +363,54 @@ def sign_efi(bzimage_path: pathlib.PosixPath,
                                  "--cert", db_crt_path,
                                  "--output", output_file_path,
                                  bzimage_path], check=True)
-        print(colorize(f"\nSigned kernel {kver}.",
-                       colorama.Fore.GREEN))
+        print(f"{C.green}\nSigned kernel {kver}.{C.reset}")
     except Exception as e:
-        print(colorize(f"\nError signing kernel {kver}: {e}", colorama.Fore.RED))
+        print(f"{C.red}\nError signing kernel {kver}: {e}{C.reset}")
         sys.exit(1)
 
     return None
 
 
+@contextlib.contextmanager
+def mounted(mount_path: pathlib.PosixPath) -> typing.Iterator[None]:
+    """
+    Mount the directory specified by mount_path for the duration of the with
+    block and unmount it afterwards. If the directory is already a mount point
+    then it is left as is.
+
+    Args:
+        mount_path (pathlib.PosixPath): The path to the directory that should be
+                                        mounted.
+
+    Returns:
+        None: This generator does not yield a value.
+    """
+
+    # Skip the mount and umount commands when the directory is already mounted.
+    already_mounted = os.path.ismount(mount_path)
+
+    # Mount the directory.
+    if not already_mounted:
+        try:
+            subprocess.run(["mount",mount_path], check=True)
+            print(f"{C.green}Mounted {mount_path}.{C.reset}")
+        except Exception as e:
+            print(f"{C.red}Unknown error when mounting {mount_path}: {e}{C.reset}")
+            sys.exit(1)
+
+    try:
+        yield None
+    finally:
+        # Unmount the directory.
+        if not already_mounted:
+            try:
+                subprocess.run(["umount",mount_path], check=True)
+                print(f"{C.green}Unmounted {mount_path}.{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Unknown error when unmounting {mount_path}: {e}{C.reset}")
+                sys.exit(1)
+
+
 def install_kernel(efi_path: pathlib.PosixPath, is_uki: bool, kver: str,
                    system_name: str) -> None:
     """
@@ -277,41 +434,21 @@ def install_kernel(efi_path: pathlib.PosixPath, is_uki: bool, kver: str,
     # Create the boot directory if it doesn't exist.
     boot_dir.mkdir(parents=True, exist_ok=True)
 
-    # Mount the boot directory.
-    try:
-        subprocess.run(["mount",boot_dir], check=True)
-        print(colorize(f"Mounted {boot_dir}.",
-                       colorama.Fore.GREEN))
-    except Exception as e:
-        print(colorize(f"Unknown error when mounting {boot_dir}: {e}",
-                    colorama.Fore.RED))
-        sys.exit(1)
-
-    # Create the boot directory hierarchy if it doesn't exist.
-    boot_efi_dir.mkdir(parents=True, exist_ok=True)
-
-    # Copy the efi file to boot.
-    try:
-        shutil.copyfile(efi_path, boot_efi_path)
-        print(colorize(f"Copied {kver} to boot!",
-                       colorama.Fore.GREEN))
-    except Exception as e:
-        print(colorize(f"Unknown error when copying {kver} to boot: {e}",
-                    colorama.Fore.RED))
-        sys.exit(1)
+    # Mount the boot directory while the efi file is copied.
+    with mounted(boot_dir):
+        # Create the boot directory hierarchy if it doesn't exist.
+        boot_efi_dir.mkdir(parents=True, exist_ok=True)
 
-    # Unmount the boot directory.
-    try:
-        subprocess.run(["umount",boot_dir], check=True)
-        print(colorize(f"Unmounted {boot_dir}.",
-                       colorama.Fore.GREEN))
-    except Exception as e:
-        print(colorize(f"Unknown error when unmounting {boot_dir}: {e}",
-                    colorama.Fore.RED))
-        sys.exit(1)
+        # Copy the efi file to boot.
+        try:
+            shutil.copyfile(efi_path, boot_efi_path)
+            print(f"{C.green}Copied {kver} to boot!{C.reset}")
+        except Exception as e:
+            print(f"{C.red}Unknown error when copying {kver} to boot: {e}{C.reset}")
+            sys.exit(1)
 
     # Success message
-    print(colorize(f"Installed kernel {kver} for {system_name}.", colorama.Fore.GREEN))
+    print(f"{C.green}Installed kernel {kver} for {system_name}.{C.reset}")
 
     return None
 
@@ -334,6 +471,8 @@ def parse_arguments() -> argparse.Namespace:
                         help="specify the number of parallel jobs for compilation")
     parser.add_argument("-t", "--tmpfs", action="store_true",
                         help="compiles the kernel in a tmpfs directory (requires /etc/fstab configuration)")
+    parser.add_argument("--no-overlay", action="store_true",
+                        help="copies the kernel sources into tmpfs instead of mounting an overlayfs over them")
     parser.add_argument("-u", "--uki", action="store_true",
                         help="compiles a unified kernel image (requires dracut)")
     parser.add_argument("-s", "--sign", action="store_true",
@@ -342,6 +481,10 @@ def parse_arguments() -> argparse.Namespace:
                         help="installs the compiled efi executable to /boot")
     parser.add_argument("-n", "--nvidia", action="store_true",
                         help="compiles and installs proprietary nvidia drivers alongside the new kernel (GENTOO ONLY!)")
+    parser.add_argument("--no-ccache", action="store_true",
+                        help="disables compiling with ccache even if it is installed")
+    parser.add_argument("--distcc", metavar="HOSTS", type=str, default=None,
+                        help="distributes the compilation to the distcc HOSTS (requires distcc)")
     parser.add_argument("--nocolor", action="store_true",
                         help="disables colored output")
     args = parser.parse_args()
@@ -358,7 +501,7 @@ def main():
     """
 
     # Global variables
-    global no_color
+    global C
 
     # Check if script is run as root.
     check_if_superuser()
@@ -366,84 +509,86 @@ def main():
     # Parse our command-line arguments.
     args = parse_arguments()
     compile_nvidia = args.nvidia
+    distcc_hosts = args.distcc
     is_uki = args.uki
     install = args.install
     jobs = args.jobs
     no_color = args.nocolor
     sign_kernel = args.sign
     system_name = args.hostname
+    use_ccache = not args.no_ccache
+    use_overlay = not args.no_overlay
     use_tmpfs = args.tmpfs
 
     # Obtain environmental variables.
     if os.getenv("NO_COLOR") == "1":
         no_color = True
 
+    # Rebuild the color sequences now that --nocolor is known.
+    C = ansi_colors(no_color)
+
     # Check if OS is Gentoo if user chose to compile nvidia drivers.
     if compile_nvidia:
         os_release_path = pathlib.Path("/etc/os-release")
+        os_name = None
 
+        # Stop reading once the NAME line has been found.
         with open(os_release_path, "r") as file:
             for line in file:
-                if line.startswith("NAME"):
-                    line_list = line.split("=")
+                if line.startswith("NAME="):
+                    line_list = line.split("=", 1)
                     os_name = line_list[1].strip()
+                    break
 
         if os_name != "Gentoo":
-            print(colorize(f"Error: Compiling nvidia drivers for Non-Gentoo \
-                    systems is not supported.", colorama.Fore.RED))
+            print(f"{C.red}Error: Compiling nvidia drivers for Non-Gentoo \
+                    systems is not supported.{C.reset}")
             sys.exit(1)
 
     # Check if the specified system's local kernel directory exists.
     local_src_dir = pathlib.Path(f"/usr/local/src/{system_name}")
     
-    if not local_src_dir.is_dir():
-        print(colorize(f"Error: {local_src_dir} does not exist.",
-                       colorama.Fore.RED))
+    if not os.path.isdir(local_src_dir):
+        print(f"{C.red}Error: {local_src_dir} does not exist.{C.reset}")
         sys.exit(1)
 
     # Show the avaiable kernels in the {local_src_dir}/linux/ directory.
     linux_dir = local_src_dir / "linux"
-    print(colorize(f"Here is a list of available kernels for {system_name}:\n",
-                   colorama.Style.RESET_ALL))
+    print(f"Here is a list of available kernels for {system_name}:\n")
 
-    # Create a list of available kernels based on what is found.
-    kernels = []
-
-    for ver in linux_dir.iterdir():
-        if ver.is_dir():
-            ver_name = ver.name
-            kernels.append(ver_name)
-    
-    kernels = sorted(kernels, reverse=True)
+    # Create a list of available kernels based on what is found. os.scandir()
+    # caches each entry's type from the directory listing so is_dir() doesn't
+    # need an extra stat() call.
+    with os.scandir(linux_dir) as it:
+        kernels = sorted((entry.name for entry in it if entry.is_dir()),
+                         reverse=True)
 
     # Exit if there are no kernels available.
     if len(kernels) == 0:
-        print(colorize(f"Error: No kernels were found in {linux_dir}.",
-                       colorama.Fore.RED))
+        print(f"{C.red}Error: No kernels were found in {linux_dir}.{C.reset}")
         sys.exit(1)
     
-    # List out the available kernels with an item number associated with them.
-    for inum, item in enumerate(kernels):
-        print(colorize(f"{inum + 1}. {item}", colorama.Style.RESET_ALL))
+    # List out the available kernels with an item number associated with them
+    # using a single write.
+    sys.stdout.write("".join(f"{inum + 1}. {item}\n"
+                             for inum, item in enumerate(kernels)))
+    sys.stdout.flush()
 
     # Ask the user to choose a kernel version based on what was printed.
     while True:
-        selection = input(colorize("\nPlease select a kernel version: ",
-                                        colorama.Style.RESET_ALL)).strip()
+        selection = input("\nPlease select a kernel version: ").strip()
         if selection.isdigit():
             selection = int(selection)
         else:
-            print(colorize(f"\nInvalid selection: \"{selection}\"",
-                           colorama.Fore.RED))
-            print(colorize(f"Please enter an integer.", colorama.Fore.RED))
+            print(f"{C.red}\nInvalid selection: \"{selection}\"{C.reset}")
+            print(f"{C.red}Please enter an integer.{C.reset}")
             continue
 
         if selection <= len(kernels):
             break
         else:
-            print(colorize(f"\nInvalid selection: \"{selection}\"",
-                           colorama.Fore.RED))
-            print(colorize(f"Please try again.", colorama.Fore.RED))
+            print(f"{C.red}\nInvalid selection: \"{selection}\"{C.reset}")
+            print(f"{C.red}Please try again.{C.reset}")
 
     # Obtain the path for our chosen kernel version.
     linux_ver = kernels[selection - 1]
@@ -453,12 +598,14 @@ def main():
     # Find the value of CONFIG_LOCALVERSION.
     config_path = kernel_dir / ".config"
 
+    # Stop reading once CONFIG_LOCALVERSION has been found since it's near the
+    # top of the file.
     with open(config_path, "r") as file:
         for line in file:
-            if line.startswith("CONFIG_LOCALVERSION"):
-                line_list = line.split("=")
-                local_version = line_list[1].replace('"','').strip()
-                local_version = local_version.replace("-", "", 1)
+            if line.startswith("CONFIG_LOCALVERSION="):
+                line_list = line.split("=", 1)
+                local_version = line_list[1].strip().strip('"').lstrip("-")
+                break
 
     # Specify the full kernel version name.
     kver = f"{linux_ver_num}-{local_version}"
@@ -476,77 +623,99 @@ def main():
         # Try mounting the tmpfs directory if it isn't specified in fstab fail.
         try:
             subprocess.run(["mount", tmpfs_dir], check=True)
-            print(colorize(f"Mounted tmpfs directory /var/tmp/linux/{system_name}.",
-                           colorama.Fore.GREEN))
+            print(f"{C.green}Mounted tmpfs directory /var/tmp/linux/{system_name}.{C.reset}")
         except subprocess.CalledProcessError as e:
-            print(colorize(f"Failed to mount {tmpfs_dir}: {e}",
-                           colorama.Fore.RED))
+            print(f"{C.red}Failed to mount {tmpfs_dir}: {e}{C.reset}")
             sys.exit(1)
         except Exception as e:
-            print(colorize(f"Unknown error when mounting {tmpfs_dir}: {e}",
-                           colorama.Fore.RED))
+            print(f"{C.red}Unknown error when mounting {tmpfs_dir}: {e}{C.reset}")
             sys.exit(1)
 
-        # Copy our kernel_dir over to our tmpfs directory.
-        try:
-            shutil.copytree(kernel_dir, work_dir)
-            print(colorize(f"Copied {kver} to {work_dir}.",
-                           colorama.Fore.GREEN))
-        except Exception as e:
-            print(colorize(f"Error copying {kver} to {work_dir}: {e}",
-                           colorama.Fore.RED))
-            sys.exit(1)
+        if use_overlay:
+            # Mount an overlayfs with our kernel_dir as the read-only lower
+            # layer and a tmpfs directory as the writable upper layer. This way
+            # the sources don't need to be copied and only the files written by
+            # the build take up space in tmpfs.
+            overlay_upper_dir = tmpfs_dir / f"{linux_ver}-upper"
+            overlay_work_dir = tmpfs_dir / f"{linux_ver}-work"
+
+            for directory in [overlay_upper_dir, overlay_work_dir, work_dir]:
+                directory.mkdir(parents=True, exist_ok=True)
+
+            overlay_options = (f"lowerdir={kernel_dir},"
+                               f"upperdir={overlay_upper_dir},"
+                               f"workdir={overlay_work_dir},index=off")
+
+            try:
+                subprocess.run(["mount", "-t", "overlay", "overlay",
+                                "-o", overlay_options, work_dir], check=True)
+                print(f"{C.green}Mounted overlay of {kver} on {work_dir}.{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Error mounting overlay of {kver} on {work_dir}: {e}{C.reset}")
+                sys.exit(1)
+        else:
+            # Copy our kernel_dir over to our tmpfs directory.
+            try:
+                shutil.copytree(kernel_dir, work_dir)
+                print(f"{C.green}Copied {kver} to {work_dir}.{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Error copying {kver} to {work_dir}: {e}{C.reset}")
+                sys.exit(1)
     else:
         work_dir = kernel_dir
 
     # Change the /usr/src/linux symlink to our work_dir.
     linux_symlink = pathlib.Path("/usr/src/linux")
 
-    if linux_symlink.is_symlink():
+    if os.path.islink(linux_symlink):
         linux_symlink.unlink()
 
     linux_symlink.symlink_to(work_dir)
 
     # Compile the kernel and obtain the output efi file path.
-    efi_path = compile_kernel(compile_nvidia, is_uki, jobs, kver,
+    efi_path = compile_kernel(compile_nvidia, distcc_hosts, is_uki, jobs, kver,
                               local_src_dir, work_dir, sign_kernel,
-                              system_name)
+                              system_name, use_ccache)
 
     # Change the /usr/src/linux symlink to point to our kernel_dir.
-    if linux_symlink.is_symlink():
+    if os.path.islink(linux_symlink):
         linux_symlink.unlink()
 
     linux_symlink.symlink_to(kernel_dir)
-    print(colorize(f"Created /usr/src/linux symlink to {kver}.",
-                   colorama.Fore.GREEN))
+    print(f"{C.green}Created /usr/src/linux symlink to {kver}.{C.reset}")
 
     # Unmount the tmpfs directory.
     if use_tmpfs:
         # Go into the kernel_dir.
         os.chdir(kernel_dir)
 
-        # Remove the tmpfs work directory.
-        try:
-            shutil.rmtree(work_dir)
-            print(colorize(f"Removed tmpfs work directory for {kver}.",
-                           colorama.Fore.GREEN))
-        except Exception as e:
-            print(colorize(f"Error: unable to remove tmpfs work directory for {kver}",
-                           colorama.Fore.RED))
-            sys.exit(1)
+        if use_overlay:
+            # Unmount the overlay. Its upper layer goes away along with the
+            # tmpfs directory so nothing needs to be removed.
+            try:
+                subprocess.run(["umount", work_dir], check=True)
+                print(f"{C.green}Unmounted overlay of {kver} from {work_dir}.{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Error unmounting overlay of {kver} from {work_dir}: {e}{C.reset}")
+                sys.exit(1)
+        else:
+            # Remove the tmpfs work directory.
+            try:
+                shutil.rmtree(work_dir)
+                print(f"{C.green}Removed tmpfs work directory for {kver}.{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Error: unable to remove tmpfs work directory for {kver}{C.reset}")
+                sys.exit(1)
 
         # Unmount the tmpfs directory.
         try:
             subprocess.run(["umount", tmpfs_dir], check=True)
-            print(colorize(f"Unmounted tmpfs directory {tmpfs_dir}.",
-                           colorama.Fore.GREEN))
+            print(f"{C.green}Unmounted tmpfs directory {tmpfs_dir}.{C.reset}")
         except subprocess.CalledProcessError as e:
-            print(colorize(f"Failed to unmount {tmpfs_dir}: {e}",
-                           colorama.Fore.RED))
+            print(f"{C.red}Failed to unmount {tmpfs_dir}: {e}{C.reset}")
             sys.exit(1)
         except Exception as e:
-            print(colorize(f"Unknown error when unmounting {tmpfs_dir}: {e}",
-                        colorama.Fore.RED))
+            print(f"{C.red}Unknown error when unmounting {tmpfs_dir}: {e}{C.reset}")
             sys.exit(1)
 
     if install:
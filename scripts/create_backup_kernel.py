@@ -7,16 +7,17 @@
 # Copyright (c) 2024 Aryan
 # SPDX-License-Identifier: BSD-3-Clause
 
-# Version: 2.1.1
+# Version: 2.2.4
 
 # Import standard libraries.
 import argparse
-import colorama
+import contextlib
 import os
 import pathlib
 import shutil
 import subprocess
 import sys
+import types
 import typing
 
 
@@ -32,37 +33,41 @@ def check_if_superuser() -> None:
     # Check if uid = 0 (root) to continue.
     if os.getuid() != 0:
         program_name = pathlib.Path(sys.argv[0]).name
-        print(colorize(f"{program_name}: must be superuser.", colorama.Fore.RED))
+        print(f"{C.red}{program_name}: must be superuser.{C.reset}")
         sys.exit(1) # Exit with error code 1
 
     return None
 
 
-def colorize(text: str, color:str) -> str:
+def ansi_colors(no_color: bool) -> types.SimpleNamespace:
     """
-    Color text based on user defined choice.
+    Build the ANSI escape sequences that are used to color the output.
 
     Args:
-        text  (str): Text that is about to be printed.
-        color (str): Foreground color that the text should be printed in.
+        no_color (bool): If True then every sequence is an empty string.
 
     Returns:
-        text (str): Text that has been colored or not depending on environment variable.
+        colors (types.SimpleNamespace): The red, green and reset sequences.
     """
 
-    # Global variables
-    global no_color
+    if no_color:
+        colors = types.SimpleNamespace(red="", green="", reset="")
+    else:
+        colors = types.SimpleNamespace(red="\x1b[31m", green="\x1b[32m",
+                                       reset="\x1b[0m")
+
+    return colors
 
-    # Color the text if no_color is not set.
-    if not no_color:
-        text = color + text
 
-    return text
+# Color sequences used by print(). NO_COLOR is honored straight away and main()
+# rebuilds them once --nocolor has been parsed.
+C = ansi_colors(os.getenv("NO_COLOR") == "1")
 
 
 def get_kernel_version(efi_file_path: pathlib.PosixPath) -> typing.Optional[str]:
     """
-    Obtain the kernel version using file and capturing the 9th substring.
+    Obtain the kernel version by reading the version string pointed to by the
+    bzImage setup header. This is the same string the file command reports.
 
     Args:
         efi_file_path (pathlib.PosixPath): The path to the main kernel efi file.
@@ -73,71 +78,78 @@ def get_kernel_version(efi_file_path: pathlib.PosixPath) -> typing.Optional[str]
     """
 
     try:
-        # Use the file command to obtain infromation
-        result = subprocess.run(["file", efi_file_path], capture_output=True,
-                                text=True, check=True)
+        with open(efi_file_path, "rb") as file:
+            header = file.read(0x210)
+
+            # Check for the "HdrS" magic that marks the bzImage setup header.
+            if len(header) < 0x210 or header[0x202:0x206] != b"HdrS":
+                return None
+
+            # The kernel_version field holds the offset of the version string
+            # relative to the end of the 512 byte boot sector.
+            version_offset = int.from_bytes(header[0x20E:0x210], "little")
 
-        # Create a list based on splitting up the stdout into smaller substrings.
-        output_list = result.stdout.split()
+            if version_offset == 0:
+                return None
 
-        # Obtain the 9th value (similar to 'awk[-ing]' the 9th substring).
-        if len(output_list) >= 9:
-            kernel_version = output_list[8]
+            file.seek(version_offset + 0x200)
+            version_string = file.read(256).split(b"\x00", 1)[0].decode("ascii", "replace")
+
+        # The version string looks like "X.Y.Z-{hostname}-X.Y.Z (user@host) #1
+        # SMP ..." so the kernel version is the first substring.
+        output_list = version_string.split()
+
+        if len(output_list) >= 1:
+            kernel_version = output_list[0]
             return kernel_version
         else:
             return None
-    except subprocess.CalledProcessError as e:
-        print(colorize(f"Error executing file {efi_file_path}: {e}",
-                       colorama.Fore.RED))
+    except OSError as e:
+        print(f"{C.red}Error reading {efi_file_path}: {e}{C.reset}")
     except Exception as e:
-        print(colorize(f"Unknown error when obtaining version for {efi_file_path}: {e}",
-                       colorama.Fore.RED))
+        print(f"{C.red}Unknown error when obtaining version for {efi_file_path}: {e}{C.reset}")
 
 
-def mount_dir(mount_path: pathlib.PosixPath) -> None:
+@contextlib.contextmanager
+def mounted(mount_path: pathlib.PosixPath) -> typing.Iterator[None]:
     """
-    Mount the directory specified by mount_path.
+    Mount the directory specified by mount_path for the duration of the with
+    block and unmount it afterwards. If the directory is already a mount point
+    then it is left as is.
 
     Args:
         mount_path (pathlib.PosixPath): The path to the directory that should be
                                         mounted.
 
     Returns:
-        None: This function does not return a value.
-    """
-
-    # Use the mount command.
-    try:
-        subprocess.run(["mount", mount_path], check=True)
-    except subprocess.CalledProcessError as e:
-        print(colorize(f"Failed to mount {mount_path}: {e}",
-                       colorama.Fore.RED))
-    except Exception as e:
-        print(colorize(f"Unknown error when mounting {mount_path}: {e}",
-                       colorama.Fore.RED))
-
-
-def unmount_dir(mount_path: pathlib.PosixPath) -> None:
+        None: This generator does not yield a value.
     """
-    Unmount the directory specified by mount_path.
 
-    Args:
-        mount_path (pathlib.PosixPath): The path to the directory that should be
-                                        unmounted.
+    # Skip the mount and umount commands when the directory is already mounted.
+    already_mounted = os.path.ismount(mount_path)
 
-    Returns:
-        None: This function does not return a value.
-    """
+    # Use the mount command.
+    if not already_mounted:
+        try:
+            subprocess.run(["mount", mount_path], check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"{C.red}Failed to mount {mount_path}: {e}{C.reset}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"{C.red}Unknown error when mounting {mount_path}: {e}{C.reset}")
+            sys.exit(1)
 
-    # Use the unmount command.
     try:
-        subprocess.run(["umount", mount_path], check=True)
-    except subprocess.CalledProcessError as e:
-        print(colorize(f"Failed to unmount {mount_path}: {e}",
-                       colorama.Fore.RED))
-    except Exception as e:
-        print(colorize(f"Unknown error when unmounting {mount_path}: {e}",
-                       colorama.Fore.RED))
+        yield None
+    finally:
+        # Use the unmount command.
+        if not already_mounted:
+            try:
+                subprocess.run(["umount", mount_path], check=True)
+            except subprocess.CalledProcessError as e:
+                print(f"{C.red}Failed to unmount {mount_path}: {e}{C.reset}")
+            except Exception as e:
+                print(f"{C.red}Unknown error when unmounting {mount_path}: {e}{C.reset}")
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -149,9 +161,6 @@ def parse_arguments() -> argparse.Namespace:
         args (argparse.Namespace): Command-line arguments parsed using argparse.
     """
 
-    # Specify the global no_color variable.
-    global no_color
-
     # Parse optional arguments.
     parser = argparse.ArgumentParser(description="Copies the main boot kernel efi file to the backup location.")
     parser.add_argument("--nocolor", action="store_true",
@@ -168,7 +177,7 @@ def main():
     """
     
     # Global variables
-    global no_color
+    global C
 
     # Check if script is run as root.
     check_if_superuser()
@@ -181,42 +190,36 @@ def main():
     if os.getenv("NO_COLOR") == "1":
         no_color = True
 
-    # Mount the boot directory.
+    # Rebuild the color sequences now that --nocolor is known.
+    C = ansi_colors(no_color)
+
+    # Specify the boot directory.
     boot_dir = pathlib.Path("/boot/")
 
     # Check if the directory exists.
-    if not boot_dir.is_dir():
-        print(colorize(f"The directory {boot_dir} does not exist.",
-                       colorama.Fore.RED))
+    if not os.path.isdir(boot_dir):
+        print(f"{C.red}The directory {boot_dir} does not exist.{C.reset}")
         sys.exit(1)
 
-    mount_dir(boot_dir)
-
     # Copy bootx64.efi to backup.efi.
     main_boot_efi_path = pathlib.Path("/boot/efi/boot/bootx64.efi")
     backup_boot_efi_path = pathlib.Path("/boot/efi/boot/backup.efi")
 
-    # Obtain kernel version for the kernel we are copying.
-    kernel_version = get_kernel_version(main_boot_efi_path)
-
-    if kernel_version is None:
-        print(colorize(f"Error obtaining the kernel version for {main_boot_efi_path}",
-                       colorama.Fore.RED))
-        unmount_dir(boot_dir)
-        sys.exit(1)
-
-    try:
-        shutil.copy(main_boot_efi_path, backup_boot_efi_path)
-        print(colorize(f"Successfully copied {kernel_version} to {backup_boot_efi_path}.",
-                       colorama.Fore.GREEN))
-    except Exception as e:
-        print(colorize(f"Failed to copy {kernel_version} to backup location: {e}",
-                       colorama.Fore.RED))
-        unmount_dir(boot_dir)
-        sys.exit(1)
-
-    # Unmount the boot directory.
-    unmount_dir(boot_dir)
+    # Mount the boot directory while the efi file is copied.
+    with mounted(boot_dir):
+        # Obtain kernel version for the kernel we are copying.
+        kernel_version = get_kernel_version(main_boot_efi_path)
+
+        if kernel_version is None:
+            print(f"{C.red}Error obtaining the kernel version for {main_boot_efi_path}{C.reset}")
+            sys.exit(1)
+
+        try:
+            shutil.copy(main_boot_efi_path, backup_boot_efi_path)
+            print(f"{C.green}Successfully copied {kernel_version} to {backup_boot_efi_path}.{C.reset}")
+        except Exception as e:
+            print(f"{C.red}Failed to copy {kernel_version} to backup location: {e}{C.reset}")
+            sys.exit(1)
 
 
 if __name__ == "__main__":
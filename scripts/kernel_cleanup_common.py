@@ -0,0 +1,99 @@
+# Script Name: kernel_cleanup_common.py
+# Script Path: <git_root>/scripts/kernel_cleanup_common.py
+# Description: Helpers shared by the clean up scripts.
+
+# Copyright (c) 2024 Aryan
+# SPDX-License-Identifier: BSD-3-Clause
+
+# Version: 1.1.1
+
+# Import standard libraries.
+import os
+import sys
+
+# Disable colored output if we aren't writing to a terminal or the NO_COLOR
+# environment variable is set. This is looked up once here instead of every
+# time colorize is called.
+no_color = not sys.stdout.isatty() or os.getenv("NO_COLOR") == "1"
+
+# Bind the colors once so printing doesn't look them up on colorama each time.
+# colorama is only imported when the output is actually going to be colored.
+if no_color:
+    GREEN = RED = RESET = ""
+else:
+    import colorama
+
+    GREEN = colorama.Fore.GREEN
+    RED = colorama.Fore.RED
+    RESET = colorama.Style.RESET_ALL
+
+# Name of the script used when reporting errors.
+PROGRAM_NAME = os.path.basename(sys.argv[0])
+
+
+def check_if_superuser() -> None:
+    """
+    Check if the user is root. If the user isn't root then it exits the script
+    with a failure.
+
+    Returns:
+        None: This function does not return a value.
+    """
+
+    # Check if uid = 0 (root) to continue.
+    if os.getuid():
+        print(colorize(f"{PROGRAM_NAME}: must be superuser.", RED))
+        sys.exit(1) # Exit with error code 1
+
+    return None
+
+
+def colorize(text: str, color:str) -> str:
+    """
+    Color text based on user defined choice.
+
+    Args:
+        text  (str): Text that is about to be printed.
+        color (str): Foreground color that the text should be printed in.
+
+    Returns:
+        text (str): Text that has been colored or not depending on environment variable.
+    """
+
+    # Color the text if no_color is not set.
+    return text if no_color else color + text
+
+
+def remove_tree(path: str) -> None:
+    """
+    Remove a directory tree from the bottom up. Each directory is opened once
+    and its contents are removed relative to that file descriptor so the full
+    path doesn't need to be resolved for every entry.
+
+    Args:
+        path (str): The absolute path to the directory that should be removed.
+
+    Returns:
+        None: This function does not return a value.
+    """
+
+    for root, dirs, files in os.walk(path, topdown=False):
+        fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+
+        try:
+            for name in files:
+                os.unlink(name, dir_fd=fd)
+
+            # Symlinks to directories are listed in dirs but aren't walked
+            # into, so unlink them instead.
+            for name in dirs:
+                try:
+                    os.rmdir(name, dir_fd=fd)
+                except NotADirectoryError:
+                    os.unlink(name, dir_fd=fd)
+        finally:
+            os.close(fd)
+
+    os.rmdir(path)
+
+    return None
@@ -0,0 +1,28 @@
+# Script Name: kernel_version.py
+# Script Path: <git_root>/scripts/kernel_version.py
+# Description: Orders kernel files and directories by version number.
+
+# Copyright (c) 2024 Aryan
+# SPDX-License-Identifier: BSD-3-Clause
+
+# Version: 1.0.0
+
+# Import standard libraries.
+import re
+
+
+def kernel_version_key(name: str) -> tuple:
+    """
+    Sort key that orders kernel files and directories by version number, so
+    that linux-6.10.1 comes after linux-6.9.12.
+
+    Args:
+        name (str): The name of the kernel file or directory.
+
+    Returns:
+        version (tuple): The numbers found in the name.
+    """
+
+    version = tuple(int(number) for number in re.findall(r"\d+", name))
+
+    return version
@@ -7,18 +7,44 @@
 # Copyright (c) 2024 Aryan
 # SPDX-License-Identifier: BSD-3-Clause
 
-# Version: 2.1.3
+# Version: 2.2.11
 
 # Import modules to interface with the system.
 import argparse
-import colorama
 import os
-import pathlib
+import re
 import shutil
 import socket
 import subprocess
 import sys
-import typing
+
+# Import the kernel version sort key shared with the clean up scripts.
+from kernel_version import kernel_version_key
+
+# Matches the X.Y.Z version at the end of CONFIG_LOCALVERSION="-{hostname}-X.Y.Z".
+LOCALVERSION_PATTERN = re.compile(rb'^CONFIG_LOCALVERSION="-.*-(\d+)\.(\d+)\.(\d+)"$',
+                                  re.MULTILINE)
+
+# Answers accepted by the yes/no prompt.
+YES_ANSWERS = frozenset({"", "y", "yes"})
+NO_ANSWERS = frozenset({"n", "no"})
+
+
+class Fore:
+    """
+    ANSI escape sequences for the foreground colors, in place of colorama.Fore.
+    """
+
+    GREEN = "\x1b[32m"
+    RED = "\x1b[31m"
+
+
+class Style:
+    """
+    ANSI escape sequences for the text styles, in place of colorama.Style.
+    """
+
+    RESET_ALL = "\x1b[0m"
 
 
 def check_if_superuser() -> None:
@@ -32,8 +58,8 @@ def check_if_superuser() -> None:
 
     # Check if uid = 0 (root) to continue.
     if os.getuid() != 0:
-        program_name = pathlib.Path(sys.argv[0]).name
-        print(colorize(f"{program_name}: must be superuser.", colorama.Fore.RED))
+        program_name = os.path.basename(sys.argv[0])
+        print(colorize(f"{program_name}: must be superuser.", Fore.RED))
         sys.exit(1) # Exit with error code 1
 
     return None
@@ -41,26 +67,42 @@ def check_if_superuser() -> None:
 
 def colorize(text: str, color:str) -> str:
     """
-    Color text based on user defined choice.
+    Color text and reset the color after it. This is swapped out for
+    leave_uncolored when colors are disabled so it doesn't need to check for
+    that on every call.
 
     Args:
         text  (str): Text that is about to be printed.
         color (str): Foreground color that the text should be printed in.
 
     Returns:
-        text (str): Text that has been colored or not depending on environment variable.
+        text (str): Text that has been colored.
     """
 
-    # Global variables
-    global no_color
+    return color + text + Style.RESET_ALL
+
+
+def leave_uncolored(text: str, color:str) -> str:
+    """
+    Stand-in for colorize when colors are disabled.
+
+    Args:
+        text  (str): Text that is about to be printed.
+        color (str): Unused, kept so the signature matches colorize.
 
-    # Color the text if no_color is not set.
-    if not no_color:
-        text = color + text
+    Returns:
+        text (str): The text unchanged.
+    """
 
     return text
 
 
+# Disable colors straight away if NO_COLOR is set. main() also disables them
+# when --nocolor is passed.
+if os.getenv("NO_COLOR") == "1":
+    colorize = leave_uncolored
+
+
 def parse_arguments() -> argparse.Namespace:
     """
     Parse arguments that have been passed in the command line using the argparse
@@ -71,10 +113,12 @@ def parse_arguments() -> argparse.Namespace:
     """
 
     # Parse optional arguments.
-    parser = argparse.ArgumentParser(description="Copies latest kernel source and runs make oldconfig.")
+    parser = argparse.ArgumentParser(description="Copies latest kernel source and runs make olddefconfig.")
     parser.add_argument("--hostname", metavar="HOSTNAME", type=str,
-                        default=socket.gethostname(),
+                        default=None,
                         help="name of the system that needs its source directories updated")
+    parser.add_argument("--oldconfig", action="store_true",
+                        help="runs the interactive make oldconfig instead of make olddefconfig")
     parser.add_argument("--nocolor", action="store_true",
                         help="disables colored output")
     args = parser.parse_args()
@@ -85,182 +129,187 @@ def parse_arguments() -> argparse.Namespace:
 def main():
     """
     Copies latest kernel source to user's local directory. Then copies the
-    previous kernel configuration and runs make oldconfig. Finally, increments
+    previous kernel configuration and runs make olddefconfig (or oldconfig if
+    the user asked for it). Finally, increments
     the MINOR semantic version for the new kernel.
     """
 
     # Global variables
-    global no_color
+    global colorize
 
     # Check if script is run as root.
     check_if_superuser()
 
     # Parse our command-line arguments.
     args = parse_arguments()
-    no_color = args.nocolor
-    system_name = args.hostname
+    config_target = "oldconfig" if args.oldconfig else "olddefconfig"
+
+    # Only look up the hostname if it wasn't passed in.
+    system_name = args.hostname or socket.gethostname()
 
-    # Obtain environmental variables.
-    if os.getenv("NO_COLOR") == "1":
-        no_color = True
+    if args.nocolor:
+        colorize = leave_uncolored
 
     # Check if the specified system's root kernel source directory exists.
-    local_src_dir = pathlib.Path("/usr/local/src/")
-    system_src_dir = local_src_dir / f"{system_name}"
-    
-    if not system_src_dir.is_dir():
+    system_src_dir = f"/usr/local/src/{system_name}"
+
+    if not os.path.isdir(system_src_dir):
         print(colorize(f"{system_src_dir} does not exist.",
-                       colorama.Fore.RED))
+                       Fore.RED))
         sys.exit(1)
 
-    linux_local_dir = system_src_dir / "linux"
+    linux_local_dir = f"{system_src_dir}/linux"
 
     # Create /usr/local/src/{hostname}/linux/ if not present.
-    if not linux_local_dir.is_dir():
-        linux_local_dir.mkdir(parents=True)
+    os.makedirs(linux_local_dir, exist_ok=True)
 
     # Obtain the path for the latest kernel configuration source.
     src_kernels = []
 
-    for path in pathlib.Path("/usr/src/").iterdir():
-        if path.is_dir() and "linux" in path.name and path.name != "linux":
-            src_kernels.append(path)
+    # os.scandir() caches each entry's type from the directory listing so
+    # is_dir() doesn't need an extra stat() call.
+    with os.scandir("/usr/src/") as it:
+        for entry in it:
+            if entry.is_dir() and "linux" in entry.name and entry.name != "linux":
+                src_kernels.append(entry.name)
 
     # Check if there are no kernels available.
     if len(src_kernels) == 0:
         print(colorize(f"Error: There are no kernels available to install" \
-                "to the local source directory", colorama.Fore.RED))
+                "to the local source directory", Fore.RED))
         sys.exit(1)
 
-    src_kernels = sorted(src_kernels, reverse=True)
-    latest_kernel_path = src_kernels[0]
-    latest_local_kernel_path = linux_local_dir / latest_kernel_path.name
+    latest_kernel_name = max(src_kernels, key=kernel_version_key)
+    latest_kernel_path = os.path.join("/usr/src", latest_kernel_name)
+    latest_local_kernel_path = os.path.join(linux_local_dir, latest_kernel_name)
+
+    # List the local kernels once. The names tell us both whether the latest
+    # kernel is already present and which kernel came before it.
+    existing_names = set()
+    local_kernels = []
+
+    with os.scandir(linux_local_dir) as it:
+        for entry in it:
+            existing_names.add(entry.name)
+
+            if entry.is_dir() and "linux" in entry.name:
+                local_kernels.append(entry.name)
 
     # See if the latest kernel is already present in the user's local src.
-    if latest_local_kernel_path.is_dir():
-        print(colorize(f"The latest kernel version {latest_kernel_path.name} already exists in {linux_local_dir}.",
-                       colorama.Fore.RED))
+    if latest_kernel_name in existing_names:
+        print(colorize(f"The latest kernel version {latest_kernel_name} already exists in {linux_local_dir}.",
+                       Fore.RED))
+        sys.exit(1)
+
+    # Check if there is no previous kernel to take the config from.
+    if len(local_kernels) == 0:
+        print(colorize(f"Error: There is no previous kernel in {linux_local_dir}" \
+                " to copy the config from.", Fore.RED))
         sys.exit(1)
 
+    prev_local_kernel_name = max(local_kernels, key=kernel_version_key)
+
     # Copy the latest kernel source to user's local linux directory.
-    print(colorize(f"Copying {latest_kernel_path.name} to {linux_local_dir}...",
-                   colorama.Style.RESET_ALL))
+    print(colorize(f"Copying {latest_kernel_name} to {linux_local_dir}...",
+                   Style.RESET_ALL))
     try:
-        shutil.copytree(latest_kernel_path, latest_local_kernel_path)
-        print(colorize(f"Sucessfully copied {latest_kernel_path.name} to {linux_local_dir}.",
-                       colorama.Fore.GREEN))
+        # Let cp copy the tree natively, reflinking the files where the
+        # filesystem allows it. Fall back to shutil.copytree without cp.
+        if shutil.which("cp") is not None:
+            subprocess.run(["cp", "-a", "--reflink=auto", "--",
+                            latest_kernel_path, latest_local_kernel_path],
+                           check=True)
+        else:
+            shutil.copytree(latest_kernel_path, latest_local_kernel_path,
+                            symlinks=True)
+
+        print(colorize(f"Sucessfully copied {latest_kernel_name} to {linux_local_dir}.",
+                       Fore.GREEN))
     except Exception as e:
-        print(colorize(f"Error copying {latest_kernel_path.name} to {linux_local_dir}.",
-                       colorama.Fore.RED))
+        print(colorize(f"Error copying {latest_kernel_name} to {linux_local_dir}.",
+                       Fore.RED))
         sys.exit(1)
 
-    # Obtain the previous kernel config and copy it to the new linux source.
-    local_kernels = []
-
-    for path in linux_local_dir.iterdir():
-        if path.is_dir() and "linux" in path.name:
-            local_kernels.append(path)
-
-    local_kernels = sorted(local_kernels, reverse=True)
-    
-    # Since we added our newer kernel source it will be the second entry in the list.
-    prev_local_kernel_path = local_kernels[1]
-    prev_kernel_config = prev_local_kernel_path / ".config"
-    latest_kernel_config = latest_local_kernel_path / ".config"
+    # Copy the previous kernel config to the new linux source.
+    prev_kernel_config = os.path.join(linux_local_dir, prev_local_kernel_name, ".config")
+    latest_kernel_config = os.path.join(latest_local_kernel_path, ".config")
 
     try:
         shutil.copyfile(prev_kernel_config, latest_kernel_config)
-        print(colorize(f"Copied {prev_local_kernel_path.name}'s config to {latest_local_kernel_path.name}.",
-                       colorama.Fore.GREEN))
+        print(colorize(f"Copied {prev_local_kernel_name}'s config to {latest_kernel_name}.",
+                       Fore.GREEN))
     except Exception as e:
-        print(colorize(f"Error copying {prev_local_kernel_path.name}'s config to {latest_local_kernel_path}.",
-                       colorama.Fore.RED))
+        print(colorize(f"Error copying {prev_local_kernel_name}'s config to {latest_local_kernel_path}.",
+                       Fore.RED))
         sys.exit(1)
 
-    # Ask the user if they want to make oldconfig.
+    # Ask the user if they want to update the config. The prompt is colored
+    # once up front instead of on every retry.
+    prompt = colorize(f"Would you like to make {config_target}? (Y/n) ",
+                      Style.RESET_ALL)
+    try_again = colorize("Please try again.", Fore.RED)
+
     while True:
-        user_input = input(colorize("Would you like to make oldconfig? (Y/n) ",
-                                    colorama.Style.RESET_ALL)).strip().lower()
+        user_input = input(prompt).strip().lower()
         print("")
 
-        if user_input == "" or user_input == "y" or user_input == "yes":
+        if user_input in YES_ANSWERS:
             break
-        elif user_input == "n" or user_input == "no":
-            print(colorize(f"Exiting...", colorama.Fore.GREEN))
+        elif user_input in NO_ANSWERS:
+            print(colorize(f"Exiting...", Fore.GREEN))
             sys.exit(0)
         else:
             print(colorize(f"\nInvalid input: \"{user_input}\"",
-                           colorama.Fore.RED))
-            print(colorize(f"Please try again.", colorama.Fore.RED))
-
-    # Change directory to the new kernel source in the users local directory.
-    os.chdir(latest_local_kernel_path)
+                           Fore.RED))
+            print(try_again)
 
-    # Make oldconfig
+    # Update the config in the new kernel source. olddefconfig sets every new
+    # symbol to its default without prompting, oldconfig asks about each one.
     try:
-        print(colorize(f"Making oldconfig...", colorama.Style.RESET_ALL))
-        result = subprocess.run(['make', 'oldconfig'], check=True)
+        print(colorize(f"Making {config_target}...", Style.RESET_ALL))
+        result = subprocess.run(['make', f'-j{os.cpu_count() or 1}', config_target],
+                                cwd=latest_local_kernel_path, check=True)
     except Exception as e:
-        print(colorize(f"Error making oldconfig: {e}", colorama.Fore.RED))
+        print(colorize(f"Error making {config_target}: {e}", Fore.RED))
         sys.exit(1)
 
-    # Increment the semver MINOR version in the latest kernel config.
-
-    ## Create a string of all the lines of the old config.
-    config_lines = latest_kernel_config.read_text().splitlines()
-
-    ## Create a new list based on that to manipulate.
-    new_config_lines = config_lines.copy()
-
-    ## Enumerate helps us to identify the position of an item in a list.
-    for n, line in enumerate(new_config_lines):
-        # Obtain the local version line.
-        if line.startswith("CONFIG_LOCALVERSION="):
-
-            # Split line up into [ 'CONFIG_LOCALVERSION', '-{hostname}-X.Y.Z' ].
-            # And remove quotation mark.
-            parts = line.replace('"', "").split("=")
+    # Increment the semver MINOR version in the latest kernel config. The local
+    # version line looks like CONFIG_LOCALVERSION="-{hostname}-X.Y.Z".
+    # The config is edited as bytes so it doesn't need to be decoded and
+    # encoded again.
+    with open(latest_kernel_config, "rb") as file:
+        config = file.read()
 
-            # Split up the "version" part into [ '"', '{hostname}', 'X.Y.Z' ].
-            version_parts = parts[1].split("-")
+    match = LOCALVERSION_PATTERN.search(config)
 
-            # Split up semantic version into [ 'X', 'Y', 'Z' ].
-            sem_version = version_parts[2].split(".")
-
-            # Obtain the MINOR version.
-            minor_version = int(sem_version[1])
-
-            # Increment the MINOR version.
-            new_minor_version = str(minor_version + 1)
-
-            # Recreate the line with the new MINOR version. 
-            new_sem_version = f"{sem_version[0]}.{new_minor_version}.{sem_version[2]}"
-            version_parts[2] = new_sem_version
-
-            # Since version_parts is a list we want to insert it into parts
-            # without parts becoming a list of lists.
-            parts[1:] = version_parts
-            parts = [ parts[0], '=', '"', '-', parts[2], '-', parts[3], '"' ]
-            new_line = "".join(parts)
+    if match is None:
+        print(colorize(f"Error: Can't find a CONFIG_LOCALVERSION=\"-{system_name}-X.Y.Z\" line" \
+                f" in {latest_kernel_name}'s config file.", Fore.RED))
+        sys.exit(1)
 
-            # Replace the local version line with our new_line
-            new_config_lines[n] = new_line
+    # Only the version numbers are replaced, the rest of the config is kept.
+    new_sem_version = f"{match[1].decode()}.{int(match[2]) + 1}.{match[3].decode()}"
+    new_config = (config[:match.start(1)] + new_sem_version.encode()
+                  + config[match.end(3):])
 
-    # Make the list into a string to write back to the config file.
-    new_config = "\n".join(new_config_lines)
+    # Write the new_config to a temporary file and rename it over .config so
+    # the config is never left half written.
+    new_kernel_config = os.path.join(latest_local_kernel_path, ".config.new")
 
-    # Write the new_config to .config.
     try:
-        latest_kernel_config.write_text(new_config)
+        with open(new_kernel_config, "wb") as file:
+            file.write(new_config)
+
+        os.replace(new_kernel_config, latest_kernel_config)
         print(colorize(f"Incremented kernel SEMVER to {new_sem_version}.",
-                       colorama.Fore.GREEN))
+                       Fore.GREEN))
     except IOError as e:
-         print(colorize(f"An error occurred while writing to {latest_local_kernel_path.name}'s config file: {e}",
-                        colorama.Fore.RED))
+         print(colorize(f"An error occurred while writing to {latest_kernel_name}'s config file: {e}",
+                        Fore.RED))
          sys.exit(1)
 
     # Success!
-    print(colorize(f"Updated kernel source to {latest_kernel_path.name}-{system_name}-{new_sem_version}. Exiting...", colorama.Fore.GREEN))
+    print(colorize(f"Updated kernel source to {latest_kernel_name}-{system_name}-{new_sem_version}. Exiting...", Fore.GREEN))
 
 
 if __name__ == "__main__":